@@ -1,10 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
 
+from app import cache
 from app.database import get_db
 from app.schemas import (
-    BatchCreate, BatchResponse, RecordCreate, RecordResponse,
+    BatchCreate, BatchResponse, BatchDeleteResponse, RecordCreate, RecordResponse, RecordPage,
     RecordBulkUpload, MissingRecordsResult, ProcessingStatusResult,
     BatchStatistics, MessageResponse
 )
@@ -14,17 +15,25 @@ from app.services import BatchService, RecordService
 router = APIRouter(prefix="/api/v1", tags=["records"])
 
 
+def _not_found(batch_id: int) -> HTTPException:
+    """404 raised when a batch does not exist"""
+    return HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail=f"Batch with id {batch_id} not found"
+    )
+
+
 # Batch endpoints
 @router.post("/batches", response_model=BatchResponse, status_code=status.HTTP_201_CREATED)
-def create_batch(
+async def create_batch(
     batch: BatchCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Create a new batch for tracking records through a pipeline
     """
     # Check if batch name already exists
-    existing = BatchService.get_batch_by_name(db, batch.batch_name)
+    existing = await BatchService.get_batch_by_name(db, batch.batch_name)
     if existing:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -32,7 +41,8 @@ def create_batch(
         )
     
     try:
-        new_batch = BatchService.create_batch(db, batch)
+        new_batch = await BatchService.create_batch(db, batch)
+        await cache.invalidate_batches()
         return new_batch
     except Exception as e:
         raise HTTPException(
@@ -42,72 +52,64 @@ def create_batch(
 
 
 @router.get("/batches", response_model=List[BatchResponse])
-def get_all_batches(db: Session = Depends(get_db)):
+@cache.cached(lambda **_: cache.batches_key(), List[BatchResponse])
+async def get_all_batches(db: AsyncSession = Depends(get_db)):
     """
     Get all batches
     """
-    batches = BatchService.get_all_batches(db)
+    batches = await BatchService.get_all_batches(db)
     return batches
 
 
 @router.get("/batches/{batch_id}", response_model=BatchResponse)
-def get_batch(
+async def get_batch(
     batch_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Get a specific batch by ID
     """
-    batch = BatchService.get_batch_by_id(db, batch_id)
+    batch = await BatchService.get_batch_by_id(db, batch_id)
     if not batch:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Batch with id {batch_id} not found"
-        )
+        raise _not_found(batch_id)
     return batch
 
 
-@router.delete("/batches/{batch_id}", response_model=MessageResponse)
-def delete_batch(
+@router.delete("/batches/{batch_id}", response_model=BatchDeleteResponse)
+async def delete_batch(
     batch_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Delete a batch and all its records
     """
-    deleted = BatchService.delete_batch(db, batch_id)
+    deleted = await BatchService.delete_batch(db, batch_id)
     if not deleted:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Batch with id {batch_id} not found"
-        )
-    return MessageResponse(
-        message=f"Successfully deleted batch {batch_id}",
-        details={"batch_id": batch_id}
-    )
+        raise _not_found(batch_id)
+    await cache.invalidate_batch(batch_id)
+    await cache.invalidate_batches()
+    return BatchDeleteResponse.model_construct(deleted=True, id=batch_id)
 
 
 # Record endpoints
 @router.post("/records", response_model=RecordResponse, status_code=status.HTTP_201_CREATED)
-def create_record(
+async def create_record(
     batch_id: int,
     record: RecordCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Create a single record for a batch
     """
-    # Verify batch exists
-    batch = BatchService.get_batch_by_id(db, batch_id)
-    if not batch:
+    try:
+        new_record = await RecordService.create_record(db, batch_id, record)
+        await cache.invalidate_batch(batch_id)
+        return new_record
+    except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Batch with id {batch_id} not found"
+            detail=str(e)
         )
-    
-    try:
-        new_record = RecordService.create_record(db, batch_id, record)
-        return new_record
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -116,26 +118,24 @@ def create_record(
 
 
 @router.post("/records/bulk", response_model=MessageResponse, status_code=status.HTTP_201_CREATED)
-def bulk_upload_records(
+async def bulk_upload_records(
     bulk_data: RecordBulkUpload,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Bulk upload records for a batch
     """
-    # Verify batch exists
-    batch = BatchService.get_batch_by_id(db, bulk_data.batch_id)
-    if not batch:
+    try:
+        count = await RecordService.bulk_create_records(db, bulk_data.batch_id, bulk_data.records)
+        await cache.invalidate_batch(bulk_data.batch_id)
+        return MessageResponse.model_construct(
+            message=f"Successfully uploaded {count} records",
+            details={"count": count, "batch_id": bulk_data.batch_id}
+        )
+    except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Batch with id {bulk_data.batch_id} not found"
-        )
-    
-    try:
-        records = RecordService.bulk_create_records(db, bulk_data.batch_id, bulk_data.records)
-        return MessageResponse(
-            message=f"Successfully uploaded {len(records)} records",
-            details={"count": len(records), "batch_id": bulk_data.batch_id}
+            detail=str(e)
         )
     except Exception as e:
         raise HTTPException(
@@ -144,52 +144,62 @@ def bulk_upload_records(
         )
 
 
-@router.get("/records/batch/{batch_id}", response_model=List[RecordResponse])
-def get_records_by_batch(
+@router.get("/records/batch/{batch_id}", response_model=RecordPage)
+@cache.cached(
+    lambda batch_id, limit, after_id, **_: cache.batch_key(batch_id, f"records:{after_id}:{limit}"),
+    RecordPage
+)
+async def get_records_by_batch(
     batch_id: int,
-    db: Session = Depends(get_db)
+    limit: int = Query(500, ge=1, le=10_000, description="Maximum records per page"),
+    after_id: Optional[int] = Query(None, description="Return records with id greater than this"),
+    db: AsyncSession = Depends(get_db)
 ):
     """
-    Get all records for a specific batch
+    Get a page of records for a specific batch
+
+    Follow `next_after_id` to fetch the next page.
     """
-    # Verify batch exists
-    batch = BatchService.get_batch_by_id(db, batch_id)
-    if not batch:
+    try:
+        page = await RecordService.get_records_by_batch(db, batch_id, limit, after_id)
+        return page
+    except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Batch with id {batch_id} not found"
+            detail=str(e)
         )
-    
-    records = RecordService.get_records_by_batch(db, batch_id)
-    return records
 
 
-@router.get("/records/batch/{batch_id}/status/{status}", response_model=List[RecordResponse])
-def get_records_by_status(
+@router.get("/records/batch/{batch_id}/status/{status}", response_model=RecordPage)
+async def get_records_by_status(
     batch_id: int,
-    status: RecordStatus,
-    db: Session = Depends(get_db)
+    # Named record_status so it does not shadow fastapi.status below
+    record_status: RecordStatus = Path(..., alias="status"),
+    limit: int = Query(500, ge=1, le=10_000, description="Maximum records per page"),
+    after_id: Optional[int] = Query(None, description="Return records with id greater than this"),
+    db: AsyncSession = Depends(get_db)
 ):
     """
-    Get records by status (expected or processed) for a specific batch
+    Get a page of records by status (expected or processed) for a specific batch
+
+    Follow `next_after_id` to fetch the next page.
     """
-    # Verify batch exists
-    batch = BatchService.get_batch_by_id(db, batch_id)
-    if not batch:
+    try:
+        page = await RecordService.get_records_by_status(db, batch_id, record_status, limit, after_id)
+        return page
+    except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Batch with id {batch_id} not found"
+            detail=str(e)
         )
-    
-    records = RecordService.get_records_by_status(db, batch_id, status)
-    return records
 
 
 # Missing records detection endpoints (SET DIFFERENCE!)
 @router.get("/analysis/missing/{batch_id}", response_model=MissingRecordsResult)
-def analyze_missing_records(
+@cache.cached(lambda batch_id, **_: cache.batch_key(batch_id, "missing"), MissingRecordsResult)
+async def analyze_missing_records(
     batch_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Analyze missing records using SET DIFFERENCE operation
@@ -202,7 +212,7 @@ def analyze_missing_records(
     This is the core missing records detection using set operations!
     """
     try:
-        result = RecordService.find_missing_records(db, batch_id)
+        result = await RecordService.find_missing_records(db, batch_id)
         return result
     except ValueError as e:
         raise HTTPException(
@@ -217,16 +227,17 @@ def analyze_missing_records(
 
 
 @router.get("/analysis/status/{batch_id}", response_model=ProcessingStatusResult)
-def get_processing_status(
+@cache.cached(lambda batch_id, **_: cache.batch_key(batch_id, "status"), ProcessingStatusResult)
+async def get_processing_status(
     batch_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Get processing status for a batch
     Shows all expected and processed record IDs
     """
     try:
-        result = RecordService.get_processing_status(db, batch_id)
+        result = await RecordService.get_processing_status(db, batch_id)
         return result
     except ValueError as e:
         raise HTTPException(
@@ -241,15 +252,16 @@ def get_processing_status(
 
 
 @router.get("/analysis/statistics/{batch_id}", response_model=BatchStatistics)
-def get_batch_statistics(
+@cache.cached(lambda batch_id, **_: cache.batch_key(batch_id, "statistics"), BatchStatistics)
+async def get_batch_statistics(
     batch_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Get statistics for a batch
     """
     try:
-        result = RecordService.get_batch_statistics(db, batch_id)
+        result = await RecordService.get_batch_statistics(db, batch_id)
         return result
     except ValueError as e:
         raise HTTPException(
@@ -264,23 +276,22 @@ def get_batch_statistics(
 
 
 @router.delete("/records/batch/{batch_id}", response_model=MessageResponse)
-def clear_batch_records(
+async def clear_batch_records(
     batch_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Delete all records for a batch (useful for testing/reset)
     """
-    # Verify batch exists
-    batch = BatchService.get_batch_by_id(db, batch_id)
-    if not batch:
+    try:
+        count = await RecordService.clear_all_records(db, batch_id)
+    except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Batch with id {batch_id} not found"
+            detail=str(e)
         )
-    
-    count = RecordService.clear_all_records(db, batch_id)
-    return MessageResponse(
+    await cache.invalidate_batch(batch_id)
+    return MessageResponse.model_construct(
         message=f"Successfully deleted all records for batch {batch_id}",
         details={"deleted_count": count, "batch_id": batch_id}
     )
\ No newline at end of file
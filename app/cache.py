@@ -0,0 +1,108 @@
+import functools
+import inspect
+import json
+import os
+from typing import Any, Awaitable, Callable, Optional, Union
+
+import redis.asyncio as redis
+from pydantic import TypeAdapter
+
+# Redis connection for response caching; caching is disabled when unset
+REDIS_URL = os.getenv("REDIS_URL")
+CACHE_TTL = int(os.getenv("CACHE_TTL", "60"))
+CACHE_PREFIX = "mrapi"
+
+redis_client = redis.Redis.from_url(REDIS_URL) if REDIS_URL else None
+
+
+def batch_version_key(batch_id: int) -> str:
+    """Key of the counter that versions a batch's cached responses"""
+    return f"{CACHE_PREFIX}:batch:{batch_id}:version"
+
+
+async def batch_key(batch_id: int, name: str) -> str:
+    """Cache key for a response scoped to a single batch at its current version"""
+    version = await redis_client.get(batch_version_key(batch_id))
+    return f"{CACHE_PREFIX}:batch:{batch_id}:v{int(version or 0)}:{name}"
+
+
+def batches_key() -> str:
+    """Cache key for the list of all batches"""
+    return f"{CACHE_PREFIX}:batches"
+
+
+async def get_cached(key: str) -> Optional[Any]:
+    """Return the cached JSON value for a key, or None on a miss"""
+    if redis_client is None:
+        return None
+    try:
+        value = await redis_client.get(key)
+    except redis.RedisError:
+        return None
+    return json.loads(value) if value is not None else None
+
+
+async def set_cached(key: str, value: Any) -> None:
+    """Store a JSON-serializable value under a key for CACHE_TTL seconds"""
+    if redis_client is None:
+        return
+    try:
+        await redis_client.set(key, json.dumps(value), ex=CACHE_TTL)
+    except redis.RedisError:
+        pass
+
+
+async def invalidate_batch(batch_id: int) -> None:
+    """
+    Drop every cached response for a batch after its records change
+
+    Bumping the batch's version moves its responses to new keys; the
+    stale ones are never read again and expire after CACHE_TTL.
+    """
+    if redis_client is None:
+        return
+    try:
+        await redis_client.incr(batch_version_key(batch_id))
+    except redis.RedisError:
+        pass
+
+
+async def invalidate_batches() -> None:
+    """Drop the cached batch list after a batch is created or deleted"""
+    if redis_client is None:
+        return
+    try:
+        await redis_client.delete(batches_key())
+    except redis.RedisError:
+        pass
+
+
+def cached(key_builder: Callable[..., Union[str, Awaitable[str]]], response_type: Any):
+    """
+    Cache an endpoint's response in Redis
+
+    `key_builder` receives the endpoint's keyword arguments and returns the
+    cache key, or an awaitable resolving to it. The result is stored as the
+    JSON form of `response_type`.
+    """
+    adapter = TypeAdapter(response_type)
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            if redis_client is None:
+                return await func(*args, **kwargs)
+            try:
+                key = key_builder(**kwargs)
+                if inspect.isawaitable(key):
+                    key = await key
+            except redis.RedisError:
+                return await func(*args, **kwargs)
+            hit = await get_cached(key)
+            if hit is not None:
+                return hit
+            result = await func(*args, **kwargs)
+            await set_cached(key, adapter.dump_python(adapter.validate_python(result), mode="json"))
+            return result
+        return wrapper
+    return decorator
@@ -1,7 +1,6 @@
 import os
-from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
 
 # Get database credentials from environment variables
 POSTGRES_USER = os.getenv("POSTGRES_USER", "missing_records_user")
@@ -11,22 +10,24 @@ POSTGRES_PORT = os.getenv("POSTGRES_PORT", "5432")
 POSTGRES_DB = os.getenv("POSTGRES_DB", "missing_records_db")
 
 # Create database URL
-DATABASE_URL = f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
+DATABASE_URL = f"postgresql+asyncpg://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
 
-# Create SQLAlchemy engine
-engine = create_engine(DATABASE_URL)
+# Create async SQLAlchemy engine (asyncpg driver)
+# query_cache_size is raised from the default 500 so compiled statements stay cached
+engine = create_async_engine(
+    DATABASE_URL,
+    query_cache_size=1200
+)
 
-# Create SessionLocal class for database sessions
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Create SessionLocal class for async database sessions
+# (expire_on_commit=False so committed objects can be serialized without lazy-loading)
+SessionLocal = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
 
 # Create Base class for models
 Base = declarative_base()
 
 
 # Dependency to get database session
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
\ No newline at end of file
+async def get_db():
+    async with SessionLocal() as db:
+        yield db
\ No newline at end of file
@@ -1,9 +1,36 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import inspect, text
 from app.database import engine, Base
 from app.api.endpoints import router
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+
+def create_missing_tables(connection):
+    """Create database tables, skipping create_all when the schema already exists"""
+    inspector = inspect(connection)
+    existing = set(inspector.get_table_names())
+    if not existing.issuperset(Base.metadata.tables):
+        Base.metadata.create_all(bind=connection)
+        return
+    # create_all never alters existing tables, so add columns introduced since
+    batch_columns = {column["name"] for column in inspector.get_columns("batches")}
+    if "revision" not in batch_columns:
+        # Every worker runs this at startup; IF NOT EXISTS turns the ALTER of a
+        # worker that lost the race into a no-op instead of a failed boot
+        if_not_exists = "IF NOT EXISTS " if connection.dialect.name == "postgresql" else ""
+        connection.execute(
+            text(f"ALTER TABLE batches ADD COLUMN {if_not_exists}revision INTEGER NOT NULL DEFAULT 0")
+        )
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Prepare the database schema once per worker before serving requests"""
+    async with engine.begin() as conn:
+        await conn.run_sync(create_missing_tables)
+    yield
+
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -11,7 +38,10 @@ app = FastAPI(
     description="API for detecting missing records in data pipelines using set operations",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    # orjson serializes large record lists much faster than the stdlib json module
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 # Include API router
@@ -19,7 +49,7 @@ app.include_router(router)
 
 
 @app.get("/")
-def read_root():
+async def read_root():
     """Root endpoint - health check"""
     return {
         "message": "Missing Records Detection API",
@@ -30,6 +60,6 @@ def read_root():
 
 
 @app.get("/health")
-def health_check():
+async def health_check():
     """Health check endpoint"""
     return {"status": "healthy"}
\ No newline at end of file
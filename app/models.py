@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Enum, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, DateTime, Enum, ForeignKey, Text, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from datetime import datetime
@@ -29,11 +29,16 @@ class Batch(Base):
     batch_name = Column(String, nullable=False, unique=True, index=True)
     record_type = Column(Enum(RecordType), nullable=False)
     description = Column(Text, nullable=True)
+    # Bumped whenever the batch's records change; keys the analysis cache
+    revision = Column(Integer, nullable=False, default=0, server_default="0")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
     # Relationship to records
-    records = relationship("Record", back_populates="batch", cascade="all, delete-orphan")
+    # passive_deletes: rely on ON DELETE CASCADE rather than loading records to delete them
+    records = relationship(
+        "Record", back_populates="batch", cascade="all, delete-orphan", passive_deletes=True
+    )
 
     def __repr__(self):
         return f"<Batch(id={self.id}, name={self.batch_name}, type={self.record_type})>"
@@ -42,13 +47,19 @@ class Batch(Base):
 class Record(Base):
     """Record model representing individual records being tracked through a pipeline"""
     __tablename__ = "records"
+    __table_args__ = (
+        # Covers the (batch_id, status) filters and record_id anti-joins used by
+        # the analysis queries, so they run as index-only scans
+        Index("ix_records_batch_status_rid", "batch_id", "status", "record_id"),
+        # Serves keyset pagination of a batch's records ordered by id
+        Index("ix_records_batch_id_id", "batch_id", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    record_id = Column(Integer, nullable=False, index=True)
-    batch_id = Column(Integer, ForeignKey("batches.id"), nullable=False, index=True)
+    record_id = Column(Integer, nullable=False)
+    batch_id = Column(Integer, ForeignKey("batches.id", ondelete="CASCADE"), nullable=False)
     status = Column(Enum(RecordStatus), nullable=False, default=RecordStatus.EXPECTED)
-    #metadata = Column(Text, nullable=True)  # Optional JSON-like metadata
-    record_metadata = Column(Text, nullable=True)
+    record_metadata = Column(Text, nullable=True)  # Optional JSON-like metadata
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from datetime import datetime
 from typing import List, Optional
 from app.models import RecordStatus, RecordType
@@ -12,6 +12,12 @@ class BatchCreate(BaseModel):
     description: Optional[str] = Field(None, description="Optional batch description")
 
 
+class BatchDeleteResponse(BaseModel):
+    """Schema for the result of deleting a batch"""
+    deleted: bool
+    id: int
+
+
 class BatchResponse(BaseModel):
     """Schema for batch response"""
     id: int
@@ -21,8 +27,7 @@ class BatchResponse(BaseModel):
     created_at: datetime
     updated_at: Optional[datetime]
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 # Record schemas
@@ -45,13 +50,19 @@ class RecordResponse(BaseModel):
     record_id: int
     batch_id: int
     status: RecordStatus
-    #metadata: Optional[str]
     record_metadata: Optional[str]
     created_at: datetime
     updated_at: Optional[datetime]
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
+
+
+class RecordPage(BaseModel):
+    """Schema for a keyset-paginated page of records"""
+    items: List[RecordResponse]
+    next_after_id: Optional[int] = Field(
+        None, description="Pass as after_id to fetch the next page; null on the last page"
+    )
 
 
 # Analysis schemas
@@ -1,18 +1,189 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+import functools
+import asyncpg
+from cachetools import LRUCache
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+from sqlalchemy import Row, func, select, exists, distinct, insert, update, delete, bindparam
 from app.models import Batch, Record, RecordStatus, RecordType
 from app.schemas import (
-    BatchCreate, RecordCreate, MissingRecordsResult, 
+    BatchCreate, BatchResponse, RecordCreate, RecordResponse, RecordPage, MissingRecordsResult, 
     ProcessingStatusResult, BatchStatistics
 )
 from typing import List, Optional
 
+# Bulk uploads at least this large are streamed with PostgreSQL COPY
+COPY_THRESHOLD = 1000
+
+# Analysis results keyed by (name, batch_id), stored with the batch revision
+# they were computed at; a write bumps the revision and the next call replaces
+# the entry, so each method keeps at most one result per batch
+analysis_cache = LRUCache(maxsize=256)
+
+# Results listing more record IDs than this are not cached, bounding the
+# memory a worker spends on analysis_cache
+ANALYSIS_CACHE_MAX_IDS = 10_000
+
+# Names of the methods wrapped by _cached_by_revision
+_CACHED_METHODS = []
+
+
+def _status_ids(status: RecordStatus):
+    """Distinct record IDs with the given status in the :batch_id batch"""
+    return select(distinct(Record.record_id)).where(
+        Record.batch_id == bindparam("batch_id"),
+        Record.status == status
+    )
+
+
+def _anti_join(status: RecordStatus, other_status: RecordStatus):
+    """
+    Record IDs with `status` that have no counterpart with `other_status`
+
+    SET DIFFERENCE pushed into the database as a NOT EXISTS anti-join,
+    so only the difference is shipped back instead of both ID sets.
+    """
+    other = aliased(Record)
+    return _status_ids(status).where(
+        ~exists().where(
+            other.batch_id == bindparam("batch_id"),
+            other.status == other_status,
+            other.record_id == Record.record_id
+        )
+    )
+
+
+def _matched_ids():
+    """Expected record IDs that were also processed (SET INTERSECTION)"""
+    other = aliased(Record)
+    return _status_ids(RecordStatus.EXPECTED).where(
+        exists().where(
+            other.batch_id == bindparam("batch_id"),
+            other.status == RecordStatus.PROCESSED,
+            other.record_id == Record.record_id
+        )
+    )
+
+
+def _count(stmt):
+    """Scalar subquery counting the rows of a statement"""
+    return select(func.count()).select_from(stmt.subquery()).scalar_subquery()
+
+
+# Columns read for batch and record listings; selected as plain rows, not ORM instances
+BATCH_COLUMNS = (
+    Batch.id, Batch.batch_name, Batch.record_type, Batch.description,
+    Batch.created_at, Batch.updated_at
+)
+
+RECORD_COLUMNS = (
+    Record.id, Record.record_id, Record.batch_id, Record.status,
+    Record.record_metadata, Record.created_at, Record.updated_at
+)
+
+
+# Analysis statements are built once with bound parameters, so each request
+# only supplies {"batch_id": ...} and SQLAlchemy reuses the compiled SQL
+MISSING_COUNTS_STMT = select(
+    _count(_status_ids(RecordStatus.EXPECTED)).label("total_expected"),
+    _count(_status_ids(RecordStatus.PROCESSED)).label("total_processed"),
+    _count(_matched_ids()).label("successfully_processed")
+)
+
+# Missing/unexpected IDs are a set, so they are returned in no particular
+# order rather than paying for a sort of the difference on every request
+MISSING_IDS_STMT = _anti_join(
+    RecordStatus.EXPECTED, RecordStatus.PROCESSED
+).execution_options(yield_per=1000)
+
+UNEXPECTED_IDS_STMT = _anti_join(
+    RecordStatus.PROCESSED, RecordStatus.EXPECTED
+).execution_options(yield_per=1000)
+
+# Everything the analysis methods need from the batch row, including the
+# revision that keys their cached results
+BATCH_REVISION_STMT = select(
+    Batch.batch_name, Batch.record_type, Batch.revision
+).where(Batch.id == bindparam("batch_id"))
+
+# updated_at is pinned so the bump doesn't fire its onupdate and touch the
+# batch's own timestamp when only its records changed
+BUMP_REVISION_STMT = update(Batch).where(
+    Batch.id == bindparam("batch_id")
+).values(
+    revision=Batch.revision + 1, updated_at=Batch.updated_at
+).execution_options(synchronize_session=False)
+
+# Used instead of the anti-joins when the counts show nothing overlaps
+EXPECTED_IDS_STMT = _status_ids(RecordStatus.EXPECTED).execution_options(yield_per=1000)
+
+PROCESSED_IDS_STMT = _status_ids(RecordStatus.PROCESSED).execution_options(yield_per=1000)
+
+STATUS_IDS_STMT = select(Record.record_id).where(
+    Record.batch_id == bindparam("batch_id"),
+    Record.status == bindparam("status")
+).order_by(Record.record_id)
+
+BATCH_STATISTICS_STMT = select(
+    func.count(Record.id).label("total_records"),
+    func.count(Record.id).filter(
+        Record.status == RecordStatus.EXPECTED
+    ).label("expected_count"),
+    func.count(Record.id).filter(
+        Record.status == RecordStatus.PROCESSED
+    ).label("processed_count"),
+    func.count(distinct(Record.record_id)).filter(
+        Record.status == RecordStatus.EXPECTED
+    ).label("unique_expected"),
+    _count(_anti_join(RecordStatus.EXPECTED, RecordStatus.PROCESSED)).label("missing_count"),
+    _count(_matched_ids()).label("successfully_processed")
+).where(Record.batch_id == bindparam("batch_id"))
+
+
+def _cached_by_revision(method):
+    """
+    Cache an analysis method's result for the batch's current revision
+
+    Costs one primary-key lookup per call; also raises ValueError for a
+    missing batch before any analysis query runs. The wrapped method
+    receives the looked-up batch row so it doesn't fetch the batch again.
+    """
+    _CACHED_METHODS.append(method.__name__)
+
+    @functools.wraps(method)
+    async def wrapper(db: AsyncSession, batch_id: int):
+        batch = (await db.execute(BATCH_REVISION_STMT, {"batch_id": batch_id})).one_or_none()
+        if batch is None:
+            raise ValueError(f"Batch with id {batch_id} not found")
+        key = (method.__name__, batch_id)
+        entry = analysis_cache.get(key)
+        if entry is not None and entry[0] == batch.revision:
+            return entry[1]
+        result = await method(db, batch_id, batch)
+        if _id_count(result) <= ANALYSIS_CACHE_MAX_IDS:
+            analysis_cache[key] = (batch.revision, result)
+        else:
+            analysis_cache.pop(key, None)
+        return result
+    return wrapper
+
+
+def _id_count(result) -> int:
+    """Total number of record IDs listed in an analysis result"""
+    return sum(len(value) for value in vars(result).values() if isinstance(value, list))
+
+
+def _forget_batch(batch_id: int) -> None:
+    """Drop every cached analysis for a deleted batch"""
+    for name in _CACHED_METHODS:
+        analysis_cache.pop((name, batch_id), None)
+
 
 class BatchService:
     """Service class for batch operations"""
 
     @staticmethod
-    def create_batch(db: Session, batch_data: BatchCreate) -> Batch:
+    async def create_batch(db: AsyncSession, batch_data: BatchCreate) -> Batch:
         """Create a new batch for tracking records"""
         batch = Batch(
             batch_name=batch_data.batch_name,
@@ -20,42 +191,54 @@ class BatchService:
             description=batch_data.description
         )
         db.add(batch)
-        db.commit()
-        db.refresh(batch)
+        await db.commit()
+        await db.refresh(batch)
         return batch
 
     @staticmethod
-    def get_batch_by_id(db: Session, batch_id: int) -> Optional[Batch]:
+    async def get_batch_by_id(db: AsyncSession, batch_id: int) -> Optional[Batch]:
         """Get batch by ID"""
-        return db.query(Batch).filter(Batch.id == batch_id).first()
+        return await db.scalar(select(Batch).where(Batch.id == batch_id))
 
     @staticmethod
-    def get_batch_by_name(db: Session, batch_name: str) -> Optional[Batch]:
+    async def get_batch_by_name(db: AsyncSession, batch_name: str) -> Optional[Batch]:
         """Get batch by name"""
-        return db.query(Batch).filter(Batch.batch_name == batch_name).first()
+        return await db.scalar(select(Batch).where(Batch.batch_name == batch_name))
 
     @staticmethod
-    def get_all_batches(db: Session) -> List[Batch]:
-        """Get all batches"""
-        return db.query(Batch).all()
+    async def batch_exists(db: AsyncSession, batch_id: int) -> bool:
+        """Check whether a batch exists without loading it"""
+        return await db.scalar(select(exists().where(Batch.id == batch_id)))
 
     @staticmethod
-    def delete_batch(db: Session, batch_id: int) -> bool:
+    async def get_all_batches(db: AsyncSession) -> List[BatchResponse]:
+        """Get all batches, built from plain rows without ORM instances or re-validation"""
+        rows = (await db.execute(select(*BATCH_COLUMNS))).mappings().all()
+        return [BatchResponse.model_construct(**row) for row in rows]
+
+    @staticmethod
+    async def delete_batch(db: AsyncSession, batch_id: int) -> bool:
         """Delete a batch and all its records"""
-        batch = db.query(Batch).filter(Batch.id == batch_id).first()
-        if batch:
-            db.delete(batch)
-            db.commit()
-            return True
-        return False
+        # Bulk DELETEs instead of loading every child Record through the ORM cascade;
+        # records go first so this also works where the FK predates ON DELETE CASCADE
+        await db.execute(delete(Record).where(Record.batch_id == batch_id))
+        deleted = (await db.execute(delete(Batch).where(Batch.id == batch_id))).rowcount
+        await db.commit()
+        _forget_batch(batch_id)
+        return deleted > 0
 
 
 class RecordService:
     """Service class for record tracking and missing records detection"""
 
     @staticmethod
-    def create_record(db: Session, batch_id: int, record_data: RecordCreate) -> Record:
-        """Create a single record"""
+    async def create_record(db: AsyncSession, batch_id: int, record_data: RecordCreate) -> Record:
+        """
+        Create a single record
+
+        Relies on the batch foreign key rather than looking the batch up first;
+        raises ValueError if the batch does not exist.
+        """
         record = Record(
             record_id=record_data.record_id,
             batch_id=batch_id,
@@ -63,82 +246,177 @@ class RecordService:
             record_metadata=record_data.record_metadata
         )
         db.add(record)
-        db.commit()
-        db.refresh(record)
+        try:
+            await db.execute(BUMP_REVISION_STMT, {"batch_id": batch_id})
+            await db.commit()
+        except IntegrityError:
+            await db.rollback()
+            raise ValueError(f"Batch with id {batch_id} not found")
+        await db.refresh(record)
         return record
 
     @staticmethod
-    def bulk_create_records(db: Session, batch_id: int, records_data: List[RecordCreate]) -> List[Record]:
-        """Bulk create records"""
-        records = [
-            Record(
-                record_id=record_data.record_id,
-                batch_id=batch_id,
-                status=record_data.status,
-                record_metadata=record_data.record_metadata
+    async def _bulk_copy_records(db: AsyncSession, batch_id: int, records_data: List[RecordCreate]) -> int:
+        """
+        Stream records into PostgreSQL with COPY ... FROM STDIN
 
+        Uses asyncpg's binary COPY on the session's own connection, so the rows
+        are committed together with the rest of the session's transaction.
+        """
+        connection = await db.connection()
+        raw_connection = await connection.get_raw_connection()
+        try:
+            await raw_connection.driver_connection.copy_records_to_table(
+                "records",
+                columns=["record_id", "batch_id", "status", "record_metadata"],
+                records=[
+                    (
+                        record_data.record_id,
+                        batch_id,
+                        # The status column stores Enum member names
+                        record_data.status.name,
+                        record_data.record_metadata
+                    )
+                    for record_data in records_data
+                ]
             )
+        except asyncpg.IntegrityConstraintViolationError as e:
+            # Raw driver calls bypass SQLAlchemy's exception wrapping
+            raise IntegrityError("COPY records", None, e) from e
+        return len(records_data)
+
+    @staticmethod
+    async def bulk_create_records(db: AsyncSession, batch_id: int, records_data: List[RecordCreate]) -> int:
+        """
+        Bulk create records
+
+        Uses COPY for large uploads on PostgreSQL and a Core executemany INSERT
+        otherwise, so no ORM identity map or per-row unit-of-work bookkeeping.
+        Returns the number of rows inserted; raises ValueError if the batch
+        does not exist.
+        """
+        if not records_data:
+            if not await BatchService.batch_exists(db, batch_id):
+                raise ValueError(f"Batch with id {batch_id} not found")
+            return 0
+
+        try:
+            if db.get_bind().dialect.name == "postgresql" and len(records_data) >= COPY_THRESHOLD:
+                count = await RecordService._bulk_copy_records(db, batch_id, records_data)
+            else:
+                count = await RecordService._bulk_insert_records(db, batch_id, records_data)
+            await db.execute(BUMP_REVISION_STMT, {"batch_id": batch_id})
+            await db.commit()
+        except IntegrityError:
+            await db.rollback()
+            raise ValueError(f"Batch with id {batch_id} not found")
+        return count
+
+    @staticmethod
+    async def _bulk_insert_records(db: AsyncSession, batch_id: int, records_data: List[RecordCreate]) -> int:
+        """Insert records with a single Core executemany INSERT"""
+        mappings = [
+            {
+                "record_id": record_data.record_id,
+                "batch_id": batch_id,
+                "status": record_data.status,
+                "record_metadata": record_data.record_metadata
+            }
             for record_data in records_data
         ]
-        db.add_all(records)
-        db.commit()
-        return records
+        await db.execute(insert(Record), mappings)
+        return len(mappings)
+
+    @staticmethod
+    async def _record_page(
+        db: AsyncSession, batch_id: int, stmt, limit: int, after_id: Optional[int]
+    ) -> RecordPage:
+        """
+        Fetch one keyset page of records ordered by id
+
+        Pages continue from `after_id` instead of using OFFSET, so every page
+        is an index range scan no matter how deep into the batch it is.
+        The batch is only looked up when the page comes back empty.
+
+        Rows come straight from the database, so the response models are
+        built with model_construct, skipping ORM hydration and re-validation.
+        """
+        if after_id is not None:
+            stmt = stmt.where(Record.id > after_id)
+        rows = (await db.execute(stmt.order_by(Record.id).limit(limit))).mappings().all()
+        if not rows and not await BatchService.batch_exists(db, batch_id):
+            raise ValueError(f"Batch with id {batch_id} not found")
+        next_after_id = rows[-1]["id"] if len(rows) == limit else None
+        return RecordPage.model_construct(
+            items=[RecordResponse.model_construct(**row) for row in rows],
+            next_after_id=next_after_id
+        )
 
     @staticmethod
-    def get_records_by_batch(db: Session, batch_id: int) -> List[Record]:
-        """Get all records for a batch"""
-        return db.query(Record).filter(Record.batch_id == batch_id).all()
+    async def get_records_by_batch(
+        db: AsyncSession, batch_id: int, limit: int, after_id: Optional[int] = None
+    ) -> RecordPage:
+        """Get a page of records for a batch"""
+        stmt = select(*RECORD_COLUMNS).where(Record.batch_id == batch_id)
+        return await RecordService._record_page(db, batch_id, stmt, limit, after_id)
 
     @staticmethod
-    def get_records_by_status(db: Session, batch_id: int, status: RecordStatus) -> List[Record]:
-        """Get records by status for a specific batch"""
-        return db.query(Record).filter(
+    async def get_records_by_status(
+        db: AsyncSession, batch_id: int, status: RecordStatus, limit: int, after_id: Optional[int] = None
+    ) -> RecordPage:
+        """Get a page of records by status for a specific batch"""
+        stmt = select(*RECORD_COLUMNS).where(
             Record.batch_id == batch_id,
             Record.status == status
-        ).all()
+        )
+        return await RecordService._record_page(db, batch_id, stmt, limit, after_id)
+
+    @staticmethod
+    async def _stream_ids(db: AsyncSession, stmt, params: dict) -> List[int]:
+        """Stream the record IDs selected by one of the analysis statements"""
+        return [record_id async for record_id in await db.stream_scalars(stmt, params)]
 
     @staticmethod
-    def find_missing_records(db: Session, batch_id: int) -> MissingRecordsResult:
+    @_cached_by_revision
+    async def find_missing_records(db: AsyncSession, batch_id: int, batch: Row) -> MissingRecordsResult:
         """
         Find missing records using SET DIFFERENCE operation
         
         Returns records that are expected but not processed,
         and records that were processed but not expected.
         """
-        # Get the batch
-        batch = db.query(Batch).filter(Batch.id == batch_id).first()
-        if not batch:
-            raise ValueError(f"Batch with id {batch_id} not found")
-
-        # Get expected records
-        expected_records = db.query(Record.record_id).filter(
-            Record.batch_id == batch_id,
-            Record.status == RecordStatus.EXPECTED
-        ).all()
-        expected_ids = set([r.record_id for r in expected_records])
-
-        # Get processed records
-        processed_records = db.query(Record.record_id).filter(
-            Record.batch_id == batch_id,
-            Record.status == RecordStatus.PROCESSED
-        ).all()
-        processed_ids = set([r.record_id for r in processed_records])
-
-        # SET DIFFERENCE OPERATIONS
+        # Count distinct expected/processed IDs and their intersection in one round trip
+        params = {"batch_id": batch_id}
+        counts = (await db.execute(MISSING_COUNTS_STMT, params)).one()
+
+        total_expected = counts.total_expected
+        total_processed = counts.total_processed
+        matched = counts.successfully_processed
+
+        # SET DIFFERENCE OPERATIONS (NOT EXISTS anti-joins, unordered)
+        # The counts settle the lopsided cases: when every ID on one side
+        # matched, its difference is empty; when none matched, it is the
+        # whole side. Only a partial overlap needs the anti-join.
         # Missing: Expected but not processed
-        missing = expected_ids - processed_ids
-        
+        if matched == total_expected:
+            missing = []
+        elif matched == 0:
+            missing = await RecordService._stream_ids(db, EXPECTED_IDS_STMT, params)
+        else:
+            missing = await RecordService._stream_ids(db, MISSING_IDS_STMT, params)
+
         # Unexpected: Processed but not expected
-        unexpected = processed_ids - expected_ids
+        if matched == total_processed:
+            unexpected = []
+        elif matched == 0:
+            unexpected = await RecordService._stream_ids(db, PROCESSED_IDS_STMT, params)
+        else:
+            unexpected = await RecordService._stream_ids(db, UNEXPECTED_IDS_STMT, params)
 
         # Calculate processing rate
-        total_expected = len(expected_ids)
-        total_processed = len(processed_ids)
-        
         if total_expected > 0:
             # Processing rate based on expected records that were successfully processed
-            successfully_processed = len(expected_ids & processed_ids)
-            processing_rate = (successfully_processed / total_expected) * 100
+            processing_rate = (matched / total_expected) * 100
         else:
             processing_rate = 0.0
 
@@ -148,104 +426,71 @@ class RecordService:
             total_expected=total_expected,
             total_processed=total_processed,
             missing_count=len(missing),
-            missing_records=sorted(list(missing)),
+            missing_records=missing,
             processing_rate=round(processing_rate, 2),
             unexpected_count=len(unexpected),
-            unexpected_records=sorted(list(unexpected))
+            unexpected_records=unexpected
         )
 
     @staticmethod
-    def get_processing_status(db: Session, batch_id: int) -> ProcessingStatusResult:
+    @_cached_by_revision
+    async def get_processing_status(db: AsyncSession, batch_id: int, batch: Row) -> ProcessingStatusResult:
         """
         Get processing status for a batch
         Shows all expected and processed record IDs
         """
-        batch = db.query(Batch).filter(Batch.id == batch_id).first()
-        if not batch:
-            raise ValueError(f"Batch with id {batch_id} not found")
-
-        # Get expected records
-        expected_records = db.query(Record.record_id).filter(
-            Record.batch_id == batch_id,
-            Record.status == RecordStatus.EXPECTED
-        ).all()
-        expected_ids = [r.record_id for r in expected_records]
+        # Get expected records (sorted by the database)
+        expected_ids = (await db.scalars(
+            STATUS_IDS_STMT, {"batch_id": batch_id, "status": RecordStatus.EXPECTED}
+        )).all()
 
         # Get processed records
-        processed_records = db.query(Record.record_id).filter(
-            Record.batch_id == batch_id,
-            Record.status == RecordStatus.PROCESSED
-        ).all()
-        processed_ids = [r.record_id for r in processed_records]
+        processed_ids = (await db.scalars(
+            STATUS_IDS_STMT, {"batch_id": batch_id, "status": RecordStatus.PROCESSED}
+        )).all()
 
         return ProcessingStatusResult(
             batch_id=batch_id,
             batch_name=batch.batch_name,
             record_type=batch.record_type,
-            expected_records=sorted(expected_ids),
-            processed_records=sorted(processed_ids),
+            expected_records=expected_ids,
+            processed_records=processed_ids,
             expected_count=len(expected_ids),
             processed_count=len(processed_ids)
         )
 
     @staticmethod
-    def get_batch_statistics(db: Session, batch_id: int) -> BatchStatistics:
+    @_cached_by_revision
+    async def get_batch_statistics(db: AsyncSession, batch_id: int, batch: Row) -> BatchStatistics:
         """Get statistics for a batch"""
-        batch = db.query(Batch).filter(Batch.id == batch_id).first()
-        if not batch:
-            raise ValueError(f"Batch with id {batch_id} not found")
-
-        # Count records by status
-        total_records = db.query(func.count(Record.id)).filter(
-            Record.batch_id == batch_id
-        ).scalar()
-
-        expected_count = db.query(func.count(Record.id)).filter(
-            Record.batch_id == batch_id,
-            Record.status == RecordStatus.EXPECTED
-        ).scalar()
-
-        processed_count = db.query(func.count(Record.id)).filter(
-            Record.batch_id == batch_id,
-            Record.status == RecordStatus.PROCESSED
-        ).scalar()
-
-        # Get unique expected and processed IDs
-        expected_records = db.query(Record.record_id).filter(
-            Record.batch_id == batch_id,
-            Record.status == RecordStatus.EXPECTED
-        ).all()
-        expected_ids = set([r.record_id for r in expected_records])
-
-        processed_records = db.query(Record.record_id).filter(
-            Record.batch_id == batch_id,
-            Record.status == RecordStatus.PROCESSED
-        ).all()
-        processed_ids = set([r.record_id for r in processed_records])
-
-        # Calculate missing
-        missing_count = len(expected_ids - processed_ids)
+        # Count records by status, unique expected IDs, missing IDs (anti-join)
+        # and matched IDs with conditional aggregation in a single round trip
+        stats = (await db.execute(BATCH_STATISTICS_STMT, {"batch_id": batch_id})).one()
 
         # Calculate processing rate
-        if len(expected_ids) > 0:
-            successfully_processed = len(expected_ids & processed_ids)
-            processing_rate = (successfully_processed / len(expected_ids)) * 100
+        if stats.unique_expected > 0:
+            processing_rate = (stats.successfully_processed / stats.unique_expected) * 100
         else:
             processing_rate = 0.0
 
         return BatchStatistics(
             batch_id=batch_id,
             batch_name=batch.batch_name,
-            total_records=total_records,
-            expected_count=expected_count,
-            processed_count=processed_count,
-            missing_count=missing_count,
+            total_records=stats.total_records,
+            expected_count=stats.expected_count,
+            processed_count=stats.processed_count,
+            missing_count=stats.missing_count,
             processing_rate=round(processing_rate, 2)
         )
 
     @staticmethod
-    def clear_all_records(db: Session, batch_id: int) -> int:
-        """Delete all records for a batch"""
-        count = db.query(Record).filter(Record.batch_id == batch_id).delete()
-        db.commit()
-        return count
\ No newline at end of file
+    async def clear_all_records(db: AsyncSession, batch_id: int) -> int:
+        """Delete all records for a batch; raises ValueError if the batch does not exist"""
+        result = await db.execute(delete(Record).where(Record.batch_id == batch_id))
+        if result.rowcount == 0:
+            if not await BatchService.batch_exists(db, batch_id):
+                raise ValueError(f"Batch with id {batch_id} not found")
+        else:
+            await db.execute(BUMP_REVISION_STMT, {"batch_id": batch_id})
+        await db.commit()
+        return result.rowcount
\ No newline at end of file
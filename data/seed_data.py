@@ -3,6 +3,7 @@
 Script to seed the database with sample order tracking data
 Usage: python data/seed_data.py
 """
+import asyncio
 import json
 import sys
 import os
@@ -10,22 +11,30 @@ import os
 # Add parent directory to path to import app modules
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+from sqlalchemy import delete, insert
+from app import cache
 from app.database import SessionLocal
 from app.models import Batch, Record, RecordType, RecordStatus
+from app.services import BUMP_REVISION_STMT, MISSING_COUNTS_STMT, MISSING_IDS_STMT
 
 
-def clear_existing_data(db):
+async def clear_existing_data(db):
     """Clear all existing data"""
-    record_count = db.query(Record).delete()
-    batch_count = db.query(Batch).delete()
-    db.commit()
+    record_count = (await db.execute(delete(Record))).rowcount
+    batch_ids = (await db.scalars(delete(Batch).returning(Batch.id))).all()
+    batch_count = len(batch_ids)
+    await db.commit()
+    # Drop the API's cached responses for the deleted batches
+    for batch_id in batch_ids:
+        await cache.invalidate_batch(batch_id)
+    await cache.invalidate_batches()
     print(f"Cleared {batch_count} existing batches and {record_count} existing records")
 
 
-def load_sample_data(db, clear_first=True):
+async def load_sample_data(db, clear_first=True):
     """Load sample order tracking data from JSON file"""
     if clear_first:
-        clear_existing_data(db)
+        await clear_existing_data(db)
     
     # Read sample data file
     json_file = os.path.join(os.path.dirname(__file__), 'sample_orders.json')
@@ -40,68 +49,52 @@ def load_sample_data(db, clear_first=True):
         description=data['batch']['description']
     )
     db.add(batch)
-    db.commit()
-    db.refresh(batch)
+    await db.commit()
+    await db.refresh(batch)
     
     print(f"Created batch: {batch.batch_name} (ID: {batch.id})")
     
-    # Create expected records
-    expected_records = []
-    for record_data in data['expected_records']:
-        record = Record(
-            record_id=record_data['record_id'],
-            batch_id=batch.id,
-            status=RecordStatus(record_data['status']),
-            record_metadata=record_data['record_metadata']
-        )
-        expected_records.append(record)
+    # Insert expected and processed records in one executemany round trip
+    records = [
+        {
+            "record_id": record_data['record_id'],
+            "batch_id": batch.id,
+            "status": RecordStatus(record_data['status']),
+            "record_metadata": record_data['record_metadata']
+        }
+        for record_data in data['expected_records'] + data['processed_records']
+    ]
+    await db.execute(insert(Record), records)
+    # Record writes bump the batch revision, which keys the API's analysis cache
+    await db.execute(BUMP_REVISION_STMT, {"batch_id": batch.id})
+    await db.commit()
+    await cache.invalidate_batches()
+    
+    print(f"Loaded {len(data['expected_records'])} expected records")
+    print(f"Loaded {len(data['processed_records'])} processed records")
+    
+    # Calculate summary statistics with the same anti-join queries the API uses
+    params = {"batch_id": batch.id}
+    counts = (await db.execute(MISSING_COUNTS_STMT, params)).one()
+    missing_ids = [record_id async for record_id in await db.stream_scalars(MISSING_IDS_STMT, params)]
     
-    db.add_all(expected_records)
-    db.commit()
-    
-    print(f"Loaded {len(expected_records)} expected records")
-    
-    # Create processed records
-    processed_records = []
-    for record_data in data['processed_records']:
-        record = Record(
-            record_id=record_data['record_id'],
-            batch_id=batch.id,
-            status=RecordStatus(record_data['status']),
-            record_metadata=record_data['record_metadata']
-        )
-        processed_records.append(record)
-    
-    db.add_all(processed_records)
-    db.commit()
-    
-    print(f"Loaded {len(processed_records)} processed records")
-    
-    # Calculate and display summary statistics
     print("\n--- Summary ---")
     print(f"Batch: {batch.batch_name}")
-    print(f"Expected orders: {len(expected_records)}")
-    print(f"Processed orders: {len(processed_records)}")
-    
-    # Calculate missing using set operations
-    expected_ids = set(r.record_id for r in expected_records)
-    processed_ids = set(r.record_id for r in processed_records)
-    
-    missing_ids = expected_ids - processed_ids  # SET DIFFERENCE
-    successfully_processed = expected_ids & processed_ids  # SET INTERSECTION
+    print(f"Expected orders: {counts.total_expected}")
+    print(f"Processed orders: {counts.total_processed}")
     
-    print(f"\nSuccessfully processed: {len(successfully_processed)} orders")
+    print(f"\nSuccessfully processed: {counts.successfully_processed} orders")
     print(f"Missing (not processed): {len(missing_ids)} orders")
-    print(f"Missing order IDs: {sorted(list(missing_ids))}")
+    print(f"Missing order IDs: {sorted(missing_ids)}")
     
-    if len(expected_ids) > 0:
-        processing_rate = (len(successfully_processed) / len(expected_ids)) * 100
+    if counts.total_expected > 0:
+        processing_rate = (counts.successfully_processed / counts.total_expected) * 100
         print(f"Processing rate: {processing_rate:.1f}%")
     
     return batch.id
 
 
-def main():
+async def main():
     """Main function"""
     print("=" * 60)
     print("Missing Records Detection API - Data Seeding")
@@ -112,7 +105,7 @@ def main():
     db = SessionLocal()
     
     try:
-        batch_id = load_sample_data(db, clear_first=True)
+        batch_id = await load_sample_data(db, clear_first=True)
         print("\n✅ Database seeded successfully!")
         print(f"\nBatch ID: {batch_id}")
         print("\nYou can now:")
@@ -121,12 +114,12 @@ def main():
         print(f"3. Try GET /api/v1/analysis/status/{batch_id}")
     except Exception as e:
         print(f"\n❌ Error seeding database: {e}")
-        db.rollback()
+        await db.rollback()
         import traceback
         traceback.print_exc()
     finally:
-        db.close()
+        await db.close()
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    asyncio.run(main())
\ No newline at end of file
@@ -1,77 +1,260 @@
+import asyncio
+import copy
+from contextlib import asynccontextmanager
+from pathlib import Path
+import httpx
+import orjson
 import pytest
-from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from app.main import app
+import pytest_asyncio
+from sqlalchemy import event, insert
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import StaticPool
 from app.database import Base, get_db
+from app.models import Batch, Record, RecordStatus, RecordType
+from app.services import analysis_cache
+from tests.constants import EXPECTED, ORDER
 
-# Use SQLite in-memory database for testing
-SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
+# Sample records, read and parsed once when the test session starts
+DATA_DIR = Path(__file__).parent / "data"
+_EXPECTED_RECORDS = tuple(orjson.loads((DATA_DIR / "expected.json").read_bytes()))
+_PROCESSED_RECORDS = tuple(orjson.loads((DATA_DIR / "processed.json").read_bytes()))
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Use an in-memory SQLite database (via aiosqlite) for testing
+SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite://"
 
 
-@pytest.fixture(scope="function")
-def db_session():
-    """Create a fresh database for each test"""
-    Base.metadata.create_all(bind=engine)
-    db = TestingSessionLocal()
+def _configure_sqlite(dbapi_connection, connection_record):
+    """Enable foreign keys (which the record endpoints rely on) and skip durability work"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.execute("PRAGMA synchronous=OFF")
+    cursor.execute("PRAGMA journal_mode=MEMORY")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+    # Let SQLAlchemy emit BEGIN itself so SAVEPOINTs nest inside the test transaction
+    dbapi_connection.isolation_level = None
+
+
+def _begin_transaction(conn):
+    conn.exec_driver_sql("BEGIN")
+
+
+async def _create_tables(engine):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+
+async def _drop_tables(engine):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+    await engine.dispose()
+
+
+@pytest.fixture(scope="session")
+def engine():
+    """In-memory database engine with the schema created once for the whole test run"""
+    # StaticPool: every session shares the single connection that holds the
+    # in-memory database, whichever event loop it is used from
+    engine = create_async_engine(
+        SQLALCHEMY_DATABASE_URL,
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    event.listen(engine.sync_engine, "connect", _configure_sqlite)
+    event.listen(engine.sync_engine, "begin", _begin_transaction)
+    asyncio.run(_create_tables(engine))
+    yield engine
+    asyncio.run(_drop_tables(engine))
+
+
+@asynccontextmanager
+async def _rolled_back_session(engine):
+    """Session inside a transaction that is rolled back on exit"""
+    connection = await engine.connect()
+    transaction = await connection.begin()
+    # Batch IDs and revisions are reused once the transaction rolls back, so drop cached results
+    analysis_cache.clear()
+    # Commits made by the code under test only release a SAVEPOINT
+    db = AsyncSession(
+        bind=connection,
+        autoflush=False,
+        expire_on_commit=False,
+        join_transaction_mode="create_savepoint"
+    )
     try:
         yield db
     finally:
-        db.close()
-        Base.metadata.drop_all(bind=engine)
+        await db.close()
+        await transaction.rollback()
+        await connection.close()
 
 
-@pytest.fixture(scope="function")
-def client(db_session):
-    """Create a test client with test database"""
-    def override_get_db():
+@asynccontextmanager
+async def _client_for(app, db):
+    """Async client whose requests all use the given session"""
+    async def override_get_db():
         try:
-            yield db_session
+            yield db
         finally:
-            db_session.close()
+            await db.close()
     
     app.dependency_overrides[get_db] = override_get_db
-    with TestClient(app) as test_client:
-        yield test_client
-    app.dependency_overrides.clear()
+    # ASGITransport does not run the lifespan, so the app never tries to
+    # create tables on its PostgreSQL engine. One client serves every request
+    # in a test; no redirect following, and app errors surface as exceptions.
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=True)
+    try:
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://testserver", follow_redirects=False
+        ) as client:
+            yield client
+    finally:
+        app.dependency_overrides.clear()
+
+
+async def _warm_up(app, engine):
+    async with _rolled_back_session(engine) as db, _client_for(app, db) as client:
+        await client.get("/health")
+        await client.get("/api/v1/batches")
+        response = await client.post(
+            "/api/v1/batches", json={"batch_name": "warmup", "record_type": ORDER}
+        )
+        batch_id = response.json()["id"]
+        await client.post(
+            "/api/v1/records/bulk",
+            json={"batch_id": batch_id, "records": [{"record_id": 1, "status": EXPECTED}]}
+        )
+        for path in ("records/batch", "analysis/missing", "analysis/status", "analysis/statistics"):
+            await client.get(f"/api/v1/{path}/{batch_id}")
+
+
+@pytest.fixture(scope="session")
+def app():
+    """The FastAPI application, imported once; tests only swap its get_db override"""
+    from app.main import app
+    return app
+
+
+@pytest.fixture(scope="session", autouse=True)
+def _no_response_cache():
+    """
+    Keep Redis out of the test run even when REDIS_URL is set
+
+    Each test rolls back its data, so batch ids are reused and cached
+    responses from one test would leak into the next.
+    """
+    from app import cache
+    redis_client, cache.redis_client = cache.redis_client, None
+    yield
+    cache.redis_client = redis_client
+
+
+@pytest.fixture(scope="session", autouse=True)
+def _warmup(app, engine, _no_response_cache):
+    """
+    Exercise every route once before the first test
 
+    Statements are compiled and cached on first use, so this keeps that cost
+    out of whichever test happens to run first. Its data is rolled back.
+    """
+    asyncio.run(_warm_up(app, engine))
 
-@pytest.fixture
+
+@pytest_asyncio.fixture
+async def db_session(engine):
+    """Run each test inside a transaction that is rolled back afterwards"""
+    async with _rolled_back_session(engine) as db:
+        yield db
+
+
+@pytest_asyncio.fixture
+async def async_client(app, db_session):
+    """Create an async test client with test database"""
+    async with _client_for(app, db_session) as client:
+        yield client
+
+
+def _shared(value):
+    """Yield session-wide reference data and fail the run if a test mutated it"""
+    snapshot = copy.deepcopy(value)
+    yield value
+    assert value == snapshot, "shared sample data was modified; copy it before mutating"
+
+
+@pytest.fixture(scope="session")
 def sample_batch():
     """Sample batch data for testing"""
-    return {
+    yield from _shared({
         "batch_name": "test_batch_orders",
-        "record_type": "order",
+        "record_type": ORDER,
         "description": "Test batch for order processing"
-    }
+    })
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def sample_expected_records():
     """Sample expected records for testing"""
-    return {
-        "records": [
-            {"record_id": 1001, "status": "expected", "record_metadata": "Order 1001"},
-            {"record_id": 1002, "status": "expected", "record_metadata": "Order 1002"},
-            {"record_id": 1003, "status": "expected", "record_metadata": "Order 1003"},
-            {"record_id": 1004, "status": "expected", "record_metadata": "Order 1004"},
-            {"record_id": 1005, "status": "expected", "record_metadata": "Order 1005"}
-        ]
-    }
+    yield from _shared({"records": _EXPECTED_RECORDS})
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def sample_processed_records():
     """Sample processed records for testing"""
-    return {
-        "records": [
-            {"record_id": 1001, "status": "processed", "record_metadata": "Order 1001 shipped"},
-            {"record_id": 1003, "status": "processed", "record_metadata": "Order 1003 shipped"},
-            {"record_id": 1005, "status": "processed", "record_metadata": "Order 1005 shipped"}
+    yield from _shared({"records": _PROCESSED_RECORDS})
+
+
+def _bulk_body(records):
+    """Bulk upload body builder with the records encoded once up front"""
+    records_json = orjson.dumps(records)
+    return lambda batch_id: b'{"batch_id":%d,"records":%s}' % (batch_id, records_json)
+
+
+@pytest.fixture(scope="session")
+def bulk_expected_bytes(sample_expected_records):
+    """Encoded bulk upload of the sample expected records, for a given batch id"""
+    return _bulk_body(sample_expected_records["records"])
+
+
+@pytest.fixture(scope="session")
+def bulk_all_bytes(sample_expected_records, sample_processed_records):
+    """Encoded bulk upload of the sample expected and processed records, for a given batch id"""
+    return _bulk_body(sample_expected_records["records"] + sample_processed_records["records"])
+
+
+@pytest_asyncio.fixture
+async def batch_row(db_session, sample_batch):
+    """Insert the sample batch straight into the database and return its id"""
+    batch_id = await db_session.scalar(
+        insert(Batch).values(
+            batch_name=sample_batch["batch_name"],
+            record_type=RecordType(sample_batch["record_type"]),
+            description=sample_batch["description"]
+        ).returning(Batch.id)
+    )
+    await db_session.commit()
+    return batch_id
+
+
+@pytest_asyncio.fixture
+async def records_loaded(request, db_session, batch_row, sample_expected_records, sample_processed_records):
+    """
+    Insert records for the sample batch straight into the database, skipping HTTP
+
+    Loads the sample expected and processed records by default. Parametrize
+    indirectly with an (expected_ids, processed_ids) pair to load other IDs.
+    Returns the batch id.
+    """
+    if hasattr(request, "param"):
+        expected_ids, processed_ids = request.param
+        records = (
+            [{"record_id": record_id, "status": RecordStatus.EXPECTED} for record_id in expected_ids]
+            + [{"record_id": record_id, "status": RecordStatus.PROCESSED} for record_id in processed_ids]
+        )
+    else:
+        records = [
+            dict(record, status=RecordStatus(record["status"]))
+            for record in sample_expected_records["records"] + sample_processed_records["records"]
         ]
-    }
\ No newline at end of file
+    await db_session.execute(insert(Record), [dict(record, batch_id=batch_row) for record in records])
+    await db_session.commit()
+    return batch_row
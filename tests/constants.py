@@ -0,0 +1,6 @@
+from app.models import RecordStatus, RecordType
+
+# Enum values as sent over the API, taken from the model's enums
+EXPECTED = RecordStatus.EXPECTED.value
+PROCESSED = RecordStatus.PROCESSED.value
+ORDER = RecordType.ORDER.value